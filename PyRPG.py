@@ -7,15 +7,22 @@ import os
 from collections import defaultdict
 import itertools
 
+import events
+from telemetry import TelemetrySink
+
 # Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
 TILE_SIZE = 32
-FPS = 60
+FPS = 60  # Render rate cap
+SIM_HZ = 60  # Simulation runs at this fixed rate regardless of FPS
+SIM_STEP = 1 / SIM_HZ
+MAX_FRAME_TIME = 0.25  # Longer frames are clamped so a stall can't snowball into endless catch-up
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)
+BATTLE_LOG_SIZE = 100  # Oldest entries are dropped past this many
 
 # New Item class
 class Item:
@@ -27,11 +34,14 @@ class Item:
         self.quantity = quantity
 
     def use(self, character):
+        # Returns how much the item actually did (e.g. HP restored)
         if self.effect == 'heal':
             heal_amount = 20
+            old_health = character.health
             character.health = min(character.health + heal_amount, 100)
-            print(f"{character.__class__.__name__} used {self.name} and healed for {heal_amount} HP.")
+            return character.health - old_health
         # Add more effects as needed
+        return 0
 
 # New Inventory class
 class Inventory:
@@ -88,9 +98,10 @@ class Character:
         if item:
             index = self.inventory.items.index(item)
             self.inventory.remove_item(index)
-            item.use(self)
+            return item.use(self)
         else:
             print(f"{self.__class__.__name__} doesn't have {item_name}.")
+            return None
 
 # Update Player class
 class Player(Character):
@@ -135,7 +146,7 @@ class Dragon(Enemy):
 
 # Update Game class
 class Game:
-    def __init__(self):
+    def __init__(self, telemetry_path=None):
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption('PyRPG 1.4')
@@ -174,6 +185,32 @@ class Game:
         self.last_entity_switch_time = 0
         self.show_battle_log = False
         self.battle_log = []  # Store all battle messages here
+        self.input_queue = []  # Key presses waiting for the next simulation step
+        self.sim_time = 0.0  # Seconds of simulated play; advances only in update()
+        self.render_time = 0.0  # sim_time interpolated to the moment being drawn
+        self.overlay_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))  # Reused by menu overlays
+        self.overlay_surface.set_alpha(200)
+        self.overlay_surface.fill(BLACK)
+
+        self.events = events.EventBus()
+        self.subscribe_message_ui()
+        self.telemetry = None
+        if telemetry_path:
+            self.telemetry = TelemetrySink(telemetry_path)
+            self.telemetry.attach(self.events)
+
+    def subscribe_message_ui(self):
+        self.events.subscribe(events.Encounter, self.on_encounter)
+        self.events.subscribe(events.Damage, self.on_damage)
+        self.events.subscribe(events.EnemyDefeated, self.on_enemy_defeated)
+        self.events.subscribe(events.RunAttempt, self.on_run_attempt)
+        self.events.subscribe(events.ItemPickedUp, self.on_item_picked_up)
+        self.events.subscribe(events.ItemUsed, self.on_item_used)
+        self.events.subscribe(events.ItemDiscarded, self.on_item_discarded)
+        self.events.subscribe(events.MapTransition, self.on_map_transition)
+        self.events.subscribe(events.Defend, self.on_defend)
+        self.events.subscribe(events.InventoryFull, self.on_inventory_full)
+        self.events.subscribe(events.ObjectUsed, self.on_object_used)
 
     def load_maps(self):
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -233,11 +270,6 @@ class Game:
                                  (start_x + x * TILE_SIZE, start_y + y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
 
         # Render entities (player, enemies, items) with loop display
-        current_time = time.time()
-        if current_time - self.last_entity_switch_time > 1:
-            self.entity_display_index += 1
-            self.last_entity_switch_time = current_time
-
         for y, row in enumerate(self.game_map):
             for x, cell in enumerate(row):
                 pos = (x, y)
@@ -260,27 +292,14 @@ class Game:
 
         # Render pickup message
         if self.pickup_message:
-            current_time = time.time()
-            if current_time - self.pickup_message_time < 2:
-                alpha = int(255 * (1 - (current_time - self.pickup_message_time) / 2))
-                pickup_text = self.font.render(self.pickup_message, True, WHITE)
-                pickup_text.set_alpha(alpha)
-                text_rect = pickup_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
-                self.screen.blit(pickup_text, text_rect)
-            else:
-                self.pickup_message = None
+            pickup_text = self.font.render(self.pickup_message, True, WHITE)
+            pickup_text.set_alpha(self.fade_alpha(self.pickup_message_time, 2))
+            text_rect = pickup_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
+            self.screen.blit(pickup_text, text_rect)
 
         # Render encounter message
         if self.encounter_message:
-            current_time = time.time()
-            if current_time - self.encounter_message_time < 2:
-                alpha = int(255 * (1 - (current_time - self.encounter_message_time) / 2))
-                encounter_text = self.font.render(self.encounter_message, True, WHITE)
-                encounter_text.set_alpha(alpha)
-                text_rect = encounter_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
-                self.screen.blit(encounter_text, text_rect)
-            else:
-                self.encounter_message = None
+            self.render_encounter_message()
 
         self.render_messages()
 
@@ -302,21 +321,16 @@ class Game:
             self.screen.blit(message_text, (50, SCREEN_HEIGHT - 150 + i * 30))
 
         if self.encounter_message:
-            current_time = time.time()
-            if current_time - self.encounter_message_time < 2:
-                alpha = int(255 * (1 - (current_time - self.encounter_message_time) / 2))
-                encounter_text = self.font.render(self.encounter_message, True, WHITE)
-                encounter_text.set_alpha(alpha)
-                text_rect = encounter_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
-                self.screen.blit(encounter_text, text_rect)
-            else:
-                self.encounter_message = None
+            self.render_encounter_message()
+
+    def render_encounter_message(self):
+        encounter_text = self.font.render(self.encounter_message, True, WHITE)
+        encounter_text.set_alpha(self.fade_alpha(self.encounter_message_time, 2))
+        text_rect = encounter_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
+        self.screen.blit(encounter_text, text_rect)
 
     def render_inventory(self):
-        inventory_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        inventory_surface.set_alpha(200)
-        inventory_surface.fill(BLACK)
-        self.screen.blit(inventory_surface, (0, 0))
+        self.screen.blit(self.overlay_surface, (0, 0))
 
         # Render player stats
         stats_text = [
@@ -367,10 +381,7 @@ class Game:
         self.screen.blit(controls_text, (SCREEN_WIDTH // 2 - controls_text.get_width() // 2, SCREEN_HEIGHT - 40))
 
     def render_action_menu(self):
-        action_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        action_surface.set_alpha(200)
-        action_surface.fill(BLACK)
-        self.screen.blit(action_surface, (0, 0))
+        self.screen.blit(self.overlay_surface, (0, 0))
 
         # Render action menu title
         action_text = self.font.render("Actions", True, WHITE)
@@ -428,10 +439,10 @@ class Game:
     def battle_attack(self):
         player_damage = random.randint(5, 15)
         self.current_enemy.health -= player_damage
-        self.add_battle_message(f"You dealt {player_damage} damage to {self.current_enemy.name}!")
+        self.events.publish(events.Damage, 'Player', self.current_enemy.name, player_damage, False)
         
         if self.current_enemy.health <= 0:
-            self.add_battle_message(f"You defeated the {self.current_enemy.name}!")
+            self.events.publish(events.EnemyDefeated, self.current_enemy.name, self.current_map_index)
             self.enemies.remove(self.current_enemy)
             self.game_map[self.current_enemy.pos[1]][self.current_enemy.pos[0]] = ' '
             self.in_battle = False
@@ -440,12 +451,12 @@ class Game:
             self.enemy_attack()
 
     def battle_defend(self):
-        self.add_battle_message("You defended against the enemy's attack!")
+        self.events.publish(events.Defend, self.current_enemy.name)
         self.enemy_attack(damage_reduction=True)
 
     def battle_run(self):
         if self.current_enemy.speed > self.player.speed:
-            self.add_battle_message("You can't run away! The enemy is faster than you.")
+            self.events.publish(events.RunAttempt, self.current_enemy.name, 'too_slow')
             self.enemy_attack()
         else:
             directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
@@ -454,11 +465,11 @@ class Game:
                 new_x, new_y = self.player.pos[0] + dx, self.player.pos[1] + dy
                 if self.player.is_valid_move([new_x, new_y], self.game_map):
                     self.player.pos = [new_x, new_y]
-                    self.add_battle_message("You successfully ran away!")
+                    self.events.publish(events.RunAttempt, self.current_enemy.name, 'escaped')
                     self.in_battle = False
                     self.current_enemy = None
                     return
-            self.add_battle_message("You couldn't find a way to escape!")
+            self.events.publish(events.RunAttempt, self.current_enemy.name, 'blocked')
             self.enemy_attack()
 
     def enemy_attack(self, damage_reduction=False):
@@ -466,9 +477,10 @@ class Game:
         if damage_reduction:
             enemy_damage = max(1, enemy_damage // 2)
         self.player.health -= enemy_damage
-        self.add_battle_message(f"{self.current_enemy.name} dealt {enemy_damage} damage to you!")
+        self.events.publish(events.Damage, self.current_enemy.name, 'Player', enemy_damage, damage_reduction)
         
         if self.player.health <= 0:
+            self.events.publish(events.PlayerDied, self.current_enemy.name, self.current_map_index)
             self.player_dead = True
             self.in_battle = False
 
@@ -484,12 +496,12 @@ class Game:
         elif event.key == pygame.K_e:
             selected_item = self.player.inventory.items[self.inventory_selected_index]
             if selected_item:
-                self.player.use_item(selected_item.name)
-                self.add_message(f"Used {selected_item.name}")
+                amount = self.player.use_item(selected_item.name)
+                self.events.publish(events.ItemUsed, selected_item.name, selected_item.effect, amount or 0)
         elif event.key == pygame.K_d:
             discarded_item = self.player.inventory.remove_item(self.inventory_selected_index)
             if discarded_item:
-                self.add_message(f"Discarded {discarded_item.name}")
+                self.events.publish(events.ItemDiscarded, discarded_item.name, discarded_item.quantity)
 
     def handle_action_menu_input(self, event):
         if event.key == pygame.K_UP:
@@ -521,27 +533,28 @@ class Game:
             if 0 <= x < len(self.game_map[0]) and 0 <= y < len(self.game_map):
                 cell = self.game_map[y][x]
                 if cell == 'D':
-                    self.add_message("You opened the door.")
+                    self.events.publish(events.ObjectUsed, 'door', x, y)
                     self.transition_to_next_map()
                     return
                 elif cell == 'B':  # 'B' for button
-                    self.add_message("You pressed the button.")
+                    self.events.publish(events.ObjectUsed, 'button', x, y)
                     # Add button functionality here
                     return
                 elif cell == 'S':  # 'S' for switch
-                    self.add_message("You flipped the switch.")
+                    self.events.publish(events.ObjectUsed, 'switch', x, y)
                     # Add switch functionality here
                     return
 
-        self.add_message("There's nothing to use here.")
+        self.events.publish(events.ObjectUsed, 'nothing', player_x, player_y)
 
     def transition_to_next_map(self):
+        old_map_index = self.current_map_index
         self.current_map_index = (self.current_map_index + 1) % len(self.maps)
         self.game_map = self.maps[self.current_map_index]['layout']
         self.player.pos = self.find_player_start()
         self.enemies = self.create_enemies()
         self.load_items()
-        self.add_message("You entered a new area.")
+        self.events.publish(events.MapTransition, old_map_index, self.current_map_index)
 
     def take_item(self):
         player_pos = tuple(self.player.pos)
@@ -551,9 +564,9 @@ class Game:
                 self.items_on_map[player_pos].pop(0)
                 if not self.items_on_map[player_pos]:
                     del self.items_on_map[player_pos]
-                self.add_message(f"Picked up {item.name}")
+                self.events.publish(events.ItemPickedUp, item.name, item.quantity)
             else:
-                self.add_message("Inventory is full")
+                self.events.publish(events.InventoryFull, item.name)
 
     def look_around(self):
         player_pos = tuple(self.player.pos)
@@ -571,37 +584,61 @@ class Game:
                 self.add_message(f"Enemies here: {enemy_names}")
 
     def handle_events(self):
+        # Only collects input; it is applied by the next simulation step
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    self.game_started = True
-                if event.key == pygame.K_q:
-                    self.running = False
-                if event.key == pygame.K_i and not self.show_action_menu and not self.show_battle_log:
-                    self.show_inventory = not self.show_inventory
-                    self.inventory_selected_index = 0
-                if event.key == pygame.K_e and not self.show_inventory and not self.show_battle_log:
-                    self.show_action_menu = not self.show_action_menu
-                    self.action_selected_index = 0
-                if self.game_started:
-                    if self.show_inventory:
-                        self.handle_inventory_input(event)
-                    elif self.show_action_menu:
-                        self.handle_action_menu_input(event)
-                    elif self.show_battle_log:
-                        if event.key == pygame.K_ESCAPE:
-                            self.show_battle_log = False
-                    elif self.in_battle:
-                        self.handle_battle_input(event)
-                    else:
-                        self.handle_movement(event)
-
-        if self.game_started and not self.in_battle and not self.show_inventory and not self.show_action_menu and not self.show_battle_log:
+                self.input_queue.append(event)
+
+    def handle_key(self, event):
+        if event.key == pygame.K_RETURN:
+            self.game_started = True
+        if event.key == pygame.K_q:
+            self.running = False
+        if event.key == pygame.K_i and not self.show_action_menu and not self.show_battle_log:
+            self.show_inventory = not self.show_inventory
+            self.inventory_selected_index = 0
+        if event.key == pygame.K_e and not self.show_inventory and not self.show_battle_log:
+            self.show_action_menu = not self.show_action_menu
+            self.action_selected_index = 0
+        if self.player_dead:
+            if event.key == pygame.K_r:
+                self.reset_game()
+        elif self.game_started:
+            if self.show_inventory:
+                self.handle_inventory_input(event)
+            elif self.show_action_menu:
+                self.handle_action_menu_input(event)
+            elif self.show_battle_log:
+                if event.key == pygame.K_ESCAPE:
+                    self.show_battle_log = False
+            elif self.in_battle:
+                self.handle_battle_input(event)
+            else:
+                self.handle_movement(event)
+
+    def update(self):
+        # Advances the game by exactly one SIM_STEP; all game logic and timers live here
+        for event in self.input_queue:
+            self.handle_key(event)
+        self.input_queue.clear()
+
+        if (self.game_started and not self.player_dead and not self.in_battle and not self.show_inventory
+                and not self.show_action_menu and not self.show_battle_log):
             self.check_for_encounter()
             self.check_for_map_transition()
 
+        self.sim_time += SIM_STEP
+        if self.sim_time - self.last_entity_switch_time > 1:
+            self.entity_display_index += 1
+            self.last_entity_switch_time = self.sim_time
+        self.messages = [(msg, t) for msg, t in self.messages if self.sim_time - t < self.message_duration]
+        if self.pickup_message and self.sim_time - self.pickup_message_time >= 2:
+            self.pickup_message = None
+        if self.encounter_message and self.sim_time - self.encounter_message_time >= 2:
+            self.encounter_message = None
+
     def handle_movement(self, event):
         direction = {
             pygame.K_a: 'left',
@@ -623,7 +660,7 @@ class Game:
         for enemy in self.enemies:
             enemy_x, enemy_y = enemy.pos
             if abs(player_x - enemy_x) <= 1 and abs(player_y - enemy_y) <= 1:
-                self.add_message(f"You encountered a {enemy.name}!")
+                self.events.publish(events.Encounter, enemy.name, enemy_x, enemy_y, self.current_map_index)
                 self.in_battle = True
                 self.current_enemy = enemy
                 self.selected_option = 0
@@ -634,29 +671,57 @@ class Game:
         pass
 
     def run(self):
-        while self.running:
-            self.handle_events()
-            self.screen.fill(BLACK)
-            
-            if not self.game_started:
-                self.render_start_screen()
-            elif self.in_battle:
-                self.render_battle_screen()
-            elif self.player_dead:
-                self.render_death_screen()
-            else:
-                self.render_map()
-                if self.show_inventory:
-                    self.render_inventory()
-                elif self.show_action_menu:
-                    self.render_action_menu()
-                elif self.show_battle_log:
-                    self.render_battle_log()
+        # Fixed-timestep loop: the simulation catches up in SIM_STEP increments while
+        # rendering happens once per frame, so slow frames never change game outcomes.
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+        try:
+            while self.running:
+                current_time = time.perf_counter()
+                accumulator += min(current_time - previous_time, MAX_FRAME_TIME)
+                previous_time = current_time
+
+                self.handle_events()
+                while accumulator >= SIM_STEP and self.running:
+                    self.update()
+                    accumulator -= SIM_STEP
+
+                self.render(accumulator / SIM_STEP)
+                self.clock.tick(FPS)
+        finally:
+            # Flush buffered telemetry even if the game crashed or was interrupted
+            if self.telemetry:
+                self.telemetry.close()
+            pygame.quit()
+
+    def step(self):
+        # One simulation step followed by a frame, independent of the wall clock
+        self.handle_events()
+        self.update()
+        self.render(1.0)
+
+    def render(self, alpha):
+        # alpha is how far real time has progressed from the previous simulation
+        # step towards the current one; render between the two snapshots.
+        self.render_time = self.sim_time - (1 - alpha) * SIM_STEP
+        self.screen.fill(BLACK)
 
-            pygame.display.flip()
-            self.clock.tick(FPS)
+        if not self.game_started:
+            self.render_start_screen()
+        elif self.in_battle:
+            self.render_battle_screen()
+        elif self.player_dead:
+            self.render_death_screen()
+        else:
+            self.render_map()
+            if self.show_inventory:
+                self.render_inventory()
+            elif self.show_action_menu:
+                self.render_action_menu()
+            elif self.show_battle_log:
+                self.render_battle_log()
 
-        pygame.quit()
+        pygame.display.flip()
 
     def render_start_screen(self):
         title_text = self.font.render("Welcome to PyRPG", True, WHITE)
@@ -670,15 +735,13 @@ class Game:
         self.screen.blit(death_text, death_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3)))
         self.screen.blit(restart_text, restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 2 // 3)))
 
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                self.reset_game()
-
     def reset_game(self):
+        self.maps = self.load_maps()  # Layouts are stripped of items and enemies as they are taken or defeated
         self.current_map_index = 0
         self.game_map = self.maps[self.current_map_index]['layout']
         self.player = Player(self.find_player_start())
         self.enemies = self.create_enemies()
+        self.items_on_map = defaultdict(list)
         self.load_items()
         self.player_dead = False
         self.in_battle = False
@@ -687,25 +750,83 @@ class Game:
         self.game_started = False
 
     def add_message(self, message):
-        self.messages.append((message, time.time()))
+        self.messages.append((message, self.sim_time))
 
     def add_battle_message(self, message):
         self.battle_messages.append(message)
         self.battle_log.append(message)  # Add to the persistent battle log
+        if len(self.battle_log) > BATTLE_LOG_SIZE:
+            self.battle_log.pop(0)
         if len(self.battle_messages) > 5:
             self.battle_messages.pop(0)
 
+    def on_encounter(self, event_type, event):
+        enemy, x, y, map_index = event
+        self.add_message(f"You encountered a {enemy}!")
+
+    def on_damage(self, event_type, event):
+        attacker, defender, amount, defended = event
+        if attacker == 'Player':
+            self.add_battle_message(f"You dealt {amount} damage to {defender}!")
+        else:
+            self.add_battle_message(f"{attacker} dealt {amount} damage to you!")
+
+    def on_enemy_defeated(self, event_type, event):
+        enemy, map_index = event
+        self.add_battle_message(f"You defeated the {enemy}!")
+
+    def on_run_attempt(self, event_type, event):
+        enemy, outcome = event
+        self.add_battle_message({
+            'escaped': "You successfully ran away!",
+            'too_slow': "You can't run away! The enemy is faster than you.",
+            'blocked': "You couldn't find a way to escape!",
+        }[outcome])
+
+    def on_item_picked_up(self, event_type, event):
+        item, quantity = event
+        self.add_message(f"Picked up {item}")
+
+    def on_item_used(self, event_type, event):
+        item, effect, amount = event
+        self.add_message(f"Used {item}")
+
+    def on_item_discarded(self, event_type, event):
+        item, quantity = event
+        self.add_message(f"Discarded {item}")
+
+    def on_map_transition(self, event_type, event):
+        from_map, to_map = event
+        self.add_message("You entered a new area.")
+
+    def on_defend(self, event_type, event):
+        enemy, = event
+        self.add_battle_message("You defended against the enemy's attack!")
+
+    def on_inventory_full(self, event_type, event):
+        item, = event
+        self.add_message("Inventory is full")
+
+    def on_object_used(self, event_type, event):
+        obj, x, y = event
+        self.add_message({
+            'door': "You opened the door.",
+            'button': "You pressed the button.",
+            'switch': "You flipped the switch.",
+            'nothing': "There's nothing to use here.",
+        }[obj])
+
+    def fade_alpha(self, timestamp, duration):
+        age = self.render_time - timestamp
+        return max(0, min(255, int(255 * (1 - age / duration))))
+
     def render_messages(self):
-        current_time = time.time()
-        self.messages = [(msg, t) for msg, t in self.messages if current_time - t < self.message_duration]
-        
         for i, (message, timestamp) in enumerate(self.messages):
-            alpha = int(255 * (1 - (current_time - timestamp) / self.message_duration))
             message_text = self.font.render(message, True, WHITE)
-            message_text.set_alpha(alpha)
+            message_text.set_alpha(self.fade_alpha(timestamp, self.message_duration))
             text_rect = message_text.get_rect(center=(SCREEN_WIDTH // 2, 100 + i * 40))
             self.screen.blit(message_text, text_rect)
 
 if __name__ == '__main__':
-    game = Game()
+    game = Game(telemetry_path=os.environ.get('PYRPG_TELEMETRY'))
     game.run()
@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+EVENT_TYPES = {}  # code -> EventType
+
+
+class EventType:
+    """A kind of gameplay event with a fixed, ordered set of typed fields.
+
+    Events are published as plain tuples in field order; building a tuple is far
+    cheaper than building an object, which keeps publishing off the frame budget.
+    """
+
+    def __init__(self, code, name, **fields):
+        if code in EVENT_TYPES:
+            raise ValueError(f"Event code {code} is already used by {EVENT_TYPES[code].name}")
+        self.code = code
+        self.name = name
+        self.fields = tuple(fields.items())  # (field name, str | int | bool)
+        EVENT_TYPES[code] = self
+
+    def field_names(self):
+        return [name for name, _ in self.fields]
+
+    def as_dict(self, event):
+        return dict(zip(self.field_names(), event))
+
+    def __repr__(self):
+        return f"EventType({self.name})"
+
+
+class EventBus:
+    def __init__(self):
+        self.handlers = defaultdict(list)
+
+    def subscribe(self, event_type, handler):
+        # Handlers are called as handler(event_type, event)
+        self.handlers[event_type].append(handler)
+
+    def subscribe_all(self, handler):
+        for event_type in EVENT_TYPES.values():
+            self.subscribe(event_type, handler)
+
+    def publish(self, event_type, *event):
+        for handler in self.handlers[event_type]:
+            handler(event_type, event)
+
+
+# Gameplay events. Codes are stored in telemetry files, so never reuse or renumber them.
+Encounter = EventType(16, 'Encounter', enemy=str, x=int, y=int, map=int)
+Damage = EventType(17, 'Damage', attacker=str, defender=str, amount=int, defended=bool)
+EnemyDefeated = EventType(18, 'EnemyDefeated', enemy=str, map=int)
+RunAttempt = EventType(19, 'RunAttempt', enemy=str, outcome=str)  # escaped, too_slow or blocked
+PlayerDied = EventType(20, 'PlayerDied', enemy=str, map=int)
+ItemPickedUp = EventType(21, 'ItemPickedUp', item=str, quantity=int)
+ItemUsed = EventType(22, 'ItemUsed', item=str, effect=str, amount=int)
+ItemDiscarded = EventType(23, 'ItemDiscarded', item=str, quantity=int)
+MapTransition = EventType(24, 'MapTransition', from_map=int, to_map=int)
+Defend = EventType(25, 'Defend', enemy=str)
+InventoryFull = EventType(26, 'InventoryFull', item=str)
+ObjectUsed = EventType(27, 'ObjectUsed', object=str, x=int, y=int)  # door, button, switch or nothing
@@ -0,0 +1,274 @@
+import os
+import sys
+
+# Run headless: these must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import ast
+import bisect
+import random
+import time
+import tracemalloc
+
+import pygame
+
+import PyRPG
+import events
+
+MOVE_KEYS = [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]
+MENU_KEYS = [pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT]
+
+
+class ScriptedInput:
+    """Picks a plausible key for the current game state, like a bored player would."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def next_key(self, game):
+        roll = self.rng.random()
+        if not game.game_started:
+            return pygame.K_RETURN
+        if game.player_dead:
+            return pygame.K_r
+        if game.in_battle:
+            return pygame.K_RETURN if roll < 0.7 else self.rng.choice([pygame.K_UP, pygame.K_DOWN])
+        if game.show_battle_log:
+            return pygame.K_ESCAPE if roll < 0.5 else None
+        if game.show_inventory:
+            if roll < 0.2:
+                return pygame.K_i
+            if roll < 0.3:
+                return pygame.K_e
+            return self.rng.choice(MENU_KEYS)
+        if game.show_action_menu:
+            return pygame.K_RETURN if roll < 0.4 else self.rng.choice([pygame.K_UP, pygame.K_DOWN])
+        if roll < 0.05:
+            return pygame.K_e
+        if roll < 0.07:
+            return pygame.K_i
+        return self.rng.choice(MOVE_KEYS)
+
+
+class SubsystemMap:
+    """Maps a line of PyRPG.py to the class or method it belongs to."""
+
+    def __init__(self, module):
+        self.filename = os.path.abspath(module.__file__)
+        with open(self.filename, 'r') as f:
+            tree = ast.parse(f.read())
+        spans = []
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                spans.append((node.lineno, node.name))
+                for child in node.body:
+                    if isinstance(child, ast.FunctionDef):
+                        spans.append((child.lineno, f"{node.name}.{child.name}"))
+            elif isinstance(node, ast.FunctionDef):
+                spans.append((node.lineno, node.name))
+        spans.sort()
+        self.starts = [line for line, _ in spans]
+        self.names = [name for _, name in spans]
+
+    def name_for(self, frame):
+        if os.path.abspath(frame.filename) != self.filename:
+            parts = frame.filename.replace('\\', '/').split('/')
+            if 'site-packages' in parts:
+                return parts[parts.index('site-packages') + 1]
+            return os.path.basename(frame.filename)
+        index = bisect.bisect_right(self.starts, frame.lineno) - 1
+        return self.names[index] if index >= 0 else 'PyRPG'
+
+
+# Keep the harness's own bookkeeping out of the numbers it reports
+HARNESS_FILTERS = [
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen posixpath>'),
+]
+
+
+def read_rss():
+    # Current resident set size, or None where it can't be read. getrusage only
+    # offers the peak (in bytes on macOS, KiB elsewhere), which can't show a plateau.
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def game_state_sizes(game):
+    return {
+        'battle_log': len(game.battle_log),
+        'battle_messages': len(game.battle_messages),
+        'messages': len(game.messages),
+        'items_on_map': sum(len(items) for items in game.items_on_map.values()),
+        'enemies': len(game.enemies),
+    }
+
+
+def map_cleared(game):
+    # Defeated enemies are gone for good, so once the current map is cleared
+    # only walking would be left to exercise there
+    return game.game_started and not game.in_battle and not game.player_dead and not game.enemies
+
+
+def advance_world(game):
+    # Move on through the door to the next map; start over once the last one is cleared
+    if game.current_map_index < len(game.maps) - 1:
+        game.transition_to_next_map()
+        return 'transition'
+    game.reset_game()
+    return 'new game'
+
+
+def group_by_subsystem(stats, subsystems):
+    totals = {}
+    for stat in stats:
+        name = subsystems.name_for(stat.traceback[0])
+        totals[name] = totals.get(name, 0) + stat.size
+    return totals
+
+
+def format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def growth(values, warmup):
+    # Compare the peak of the last third against the peak just after warmup.
+    # None when there are too few samples left to tell.
+    values = values[int(len(values) * warmup):]
+    if len(values) < 3:
+        return None
+    third = len(values) // 3
+    return max(values[-third:]) - max(values[:third])
+
+
+def soak(frames, sample_every, seed, warmup, traced_tolerance, rss_tolerance, telemetry_path=None):
+    tracemalloc.start()
+    game = PyRPG.Game(telemetry_path=telemetry_path)
+    script = ScriptedInput(seed)
+    subsystems = SubsystemMap(PyRPG)
+
+    samples = []
+    first_by_subsystem = None
+    last_by_subsystem = None
+    last_blocks = None
+    frame_peaks = []
+    frame_blocks = []
+    new_games = 0
+    transitions = []
+    game.events.subscribe(events.MapTransition, lambda event_type, event: transitions.append(event))
+    started = time.time()
+
+    for frame in range(1, frames + 1):
+        if map_cleared(game) and advance_world(game) == 'new game':
+            new_games += 1
+        key = script.next_key(game)
+        if key is not None:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+        blocks_before = sys.getallocatedblocks()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        game.step()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        blocks_after = sys.getallocatedblocks()
+        frame_peaks.append(traced_peak - traced_before)
+        frame_blocks.append(blocks_after - blocks_before)
+
+        if frame % sample_every == 0:
+            stats = tracemalloc.take_snapshot().filter_traces(HARNESS_FILTERS).statistics('lineno')
+            last_by_subsystem = group_by_subsystem(stats, subsystems)
+            if first_by_subsystem is None and frame >= frames * warmup:
+                first_by_subsystem = last_by_subsystem
+            blocks = sum(stat.count for stat in stats)
+            sample = {
+                'frame': frame,
+                'traced': sum(stat.size for stat in stats),
+                'rss': read_rss(),
+                'state': game_state_sizes(game),
+                'peak_per_frame': sum(frame_peaks) / len(frame_peaks),
+                'blocks_per_frame': sum(frame_blocks) / len(frame_blocks),
+                'game_blocks_per_frame': (blocks - last_blocks) / sample_every if last_blocks is not None else 0,
+            }
+            samples.append(sample)
+            last_blocks = blocks
+            frame_peaks = []
+            frame_blocks = []
+            simulated = frame * PyRPG.SIM_STEP / 3600
+            rss = format_bytes(sample['rss']) if sample['rss'] is not None else 'n/a'
+            print(f"[{simulated:6.2f}h sim, {time.time() - started:7.1f}s real] "
+                  f"traced={format_bytes(sample['traced'])} rss={rss} "
+                  f"transient/frame={format_bytes(sample['peak_per_frame'])} "
+                  f"net blocks/frame={sample['blocks_per_frame']:+.2f} "
+                  f"(game {sample['game_blocks_per_frame']:+.2f})")
+
+    tracemalloc.stop()
+    if game.telemetry:
+        game.telemetry.close()
+    pygame.quit()
+
+    if not samples:
+        print("No samples taken; increase --frames or lower --sample-every.")
+        return False
+
+    print("\nGrowth per subsystem (after warmup):")
+    first_by_subsystem = first_by_subsystem or last_by_subsystem
+    deltas = []
+    for name in set(first_by_subsystem) | set(last_by_subsystem):
+        delta = last_by_subsystem.get(name, 0) - first_by_subsystem.get(name, 0)
+        deltas.append((delta, name, last_by_subsystem.get(name, 0)))
+    for delta, name, size in sorted(deltas, reverse=True)[:15]:
+        print(f"  {name:40} {format_bytes(delta):>12} (now {format_bytes(size)})")
+
+    print(f"\nGame state sizes (first sample -> last sample, {len(transitions)} map transitions, "
+          f"{new_games} new games started):")
+    for name, size in samples[-1]['state'].items():
+        print(f"  {name:40} {samples[0]['state'][name]:>6} -> {size}")
+
+    traced_growth = growth([s['traced'] for s in samples], warmup)
+    if traced_growth is None:
+        print(f"\nFAIL: only {len(samples)} samples taken, too few after warmup to judge a plateau; "
+              "increase --frames or lower --sample-every.")
+        return False
+    print(f"\nTraced growth after warmup: {format_bytes(traced_growth)} (tolerance {format_bytes(traced_tolerance)})")
+    plateaued = traced_growth <= traced_tolerance
+    if any(s['rss'] is None for s in samples):
+        print("RSS unavailable on this platform; skipping the RSS check.")
+    else:
+        rss_growth = growth([s['rss'] for s in samples], warmup)
+        print(f"RSS growth after warmup: {format_bytes(rss_growth)} (tolerance {format_bytes(rss_tolerance)})")
+        plateaued = plateaued and rss_growth <= rss_tolerance
+
+    print("Memory plateaued." if plateaued else "FAIL: memory did not plateau.")
+    return plateaued
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive PyRPG headless with scripted input and track memory over time.")
+    parser.add_argument('--hours', type=float, default=2, help="Simulated hours of play, one frame per simulation step")
+    parser.add_argument('--frames', type=int, help="Exact number of frames to run (overrides --hours)")
+    parser.add_argument('--sample-every', type=int, default=PyRPG.SIM_HZ * 60, help="Frames between memory samples")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the scripted input")
+    parser.add_argument('--warmup', type=float, default=0.25, help="Fraction of the run ignored when checking for a plateau")
+    parser.add_argument('--traced-tolerance', type=int, default=256 * 1024, help="Allowed tracemalloc growth in bytes")
+    parser.add_argument('--rss-tolerance', type=int, default=8 * 1024 * 1024, help="Allowed RSS growth in bytes")
+    parser.add_argument('--telemetry', help="Also record gameplay events to this telemetry file")
+    args = parser.parse_args()
+
+    frames = args.frames if args.frames is not None else int(args.hours * 3600 * PyRPG.SIM_HZ)
+    ok = soak(frames, args.sample_every, args.seed, args.warmup, args.traced_tolerance, args.rss_tolerance,
+              args.telemetry)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import struct
+import threading
+import time
+import zlib
+from collections import deque, defaultdict
+
+from events import EVENT_TYPES
+
+# File layout: an append-only sequence of batches, one per flush.
+#   batch    MAGIC + payload length (u32) + CRC-32 of payload (u32) + payload
+#   payload  records, each a (code: u8, size: u16, milliseconds since session start: u32)
+#            header followed by `size` bytes:
+#     SESSION_START  start time (f64, unix seconds); resets the string table
+#     STRING         id (u16) + utf-8 bytes
+#     any event      its fields: str -> string id (u16), int -> i32, bool -> u8
+# A torn or corrupt batch fails its length or CRC check and is skipped by scanning
+# for the next MAGIC. Record sizes let readers skip event codes they don't know.
+MAGIC = b'PRGT'
+SESSION_START = 0
+STRING = 1
+
+BATCH = struct.Struct('<4sII')
+RECORD = struct.Struct('<BHI')
+SESSION = struct.Struct('<d')
+STRING_ID = struct.Struct('<H')
+FIELD_FORMATS = {str: 'H', int: 'i', bool: '?'}
+PENDING_LIMIT = 100000  # Oldest events are dropped if the writer falls this far behind
+
+_event_structs = {}
+
+
+def event_struct(event_type):
+    if event_type not in _event_structs:
+        fields = ''.join(FIELD_FORMATS[kind] for _, kind in event_type.fields)
+        _event_structs[event_type] = struct.Struct('<' + fields)
+    return _event_structs[event_type]
+
+
+class TelemetrySink:
+    """Batches published events and appends them to a binary file from a background thread."""
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = deque(maxlen=PENDING_LIMIT)  # Appends and pops are thread-safe
+        self.strings = {}
+        self.session_started = time.monotonic()
+        self.session_written = False
+        self.failed = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def attach(self, bus):
+        bus.subscribe_all(self.record)
+
+    def record(self, event_type, event):
+        # Runs on the game thread: keep it to a timestamp and an append
+        self.pending.append((time.monotonic(), event_type, event))
+
+    def run(self):
+        while not self.failed and not self.stopping.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        if not self.pending or self.failed:
+            return
+        try:
+            self.write_pending()
+        except (OSError, struct.error) as e:
+            # A failed write may have left a partial batch behind; appending after it
+            # would reference strings that never made it to disk, so stop for good
+            print(f"Telemetry disabled: {e}")
+            self.failed = True
+            self.pending = deque(maxlen=0)  # record() keeps working but stores nothing
+
+    def write_pending(self):
+        payload = bytearray()
+        if not self.session_written:
+            start = time.time() - (time.monotonic() - self.session_started)
+            payload += RECORD.pack(SESSION_START, SESSION.size, 0) + SESSION.pack(start)
+            self.session_written = True
+        while self.pending:
+            timestamp, event_type, event = self.pending.popleft()
+            values = []
+            for (_, kind), value in zip(event_type.fields, event):
+                values.append(self.string_id(value, payload) if kind is str else value)
+            layout = event_struct(event_type)
+            payload += RECORD.pack(event_type.code, layout.size, int((timestamp - self.session_started) * 1000))
+            payload += layout.pack(*values)
+        with open(self.path, 'ab') as f:
+            f.write(BATCH.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload)
+
+    def string_id(self, value, payload):
+        value = str(value)
+        if value not in self.strings:
+            self.strings[value] = len(self.strings)
+            encoded = value.encode('utf-8')
+            payload += RECORD.pack(STRING, STRING_ID.size + len(encoded), 0)
+            payload += STRING_ID.pack(self.strings[value]) + encoded
+        return self.strings[value]
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join()
+
+
+def read_batches(data):
+    """Yield the payload of every intact batch, or None in place of skipped bytes."""
+    offset = 0
+    while True:
+        start = data.find(MAGIC, offset)
+        if start < 0:
+            if offset < len(data):
+                yield None
+            return
+        if start > offset:
+            yield None
+        end = start + BATCH.size
+        if end <= len(data):
+            _, length, crc = BATCH.unpack_from(data, start)
+            payload = data[end:end + length]
+            if len(payload) == length and zlib.crc32(payload) == crc:
+                yield payload
+                offset = end + length
+                continue
+        yield None  # Torn or corrupt batch; resynchronise on the next MAGIC
+        offset = start + 1
+
+
+def read_events(path):
+    """Yield (unix time, event type, fields dict) for every event in a telemetry file.
+
+    Damaged batches are skipped, along with the rest of their session, since the
+    strings they defined are lost. Event codes this reader doesn't know are skipped.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    session_start = 0.0
+    strings = None  # None until a SESSION_START is seen
+    for payload in read_batches(data):
+        if payload is None:
+            strings = None
+            continue
+        offset = 0
+        while offset + RECORD.size <= len(payload):
+            code, size, millis = RECORD.unpack_from(payload, offset)
+            offset += RECORD.size
+            body = payload[offset:offset + size]
+            offset += size
+            if len(body) < size:
+                break
+            if code == SESSION_START:
+                session_start, = SESSION.unpack_from(body)
+                strings = {}
+            elif strings is None:
+                continue
+            elif code == STRING:
+                string_id, = STRING_ID.unpack_from(body)
+                strings[string_id] = body[STRING_ID.size:].decode('utf-8')
+            else:
+                event_type = EVENT_TYPES.get(code)
+                if event_type is None or event_struct(event_type).size != size:
+                    continue  # Written by a newer (or older) schema
+                fields = {}
+                for (name, kind), value in zip(event_type.fields, event_struct(event_type).unpack(body)):
+                    fields[name] = strings.get(value) if kind is str else value
+                if None in fields.values():
+                    continue
+                yield session_start + millis / 1000, event_type, fields
+
+
+def query(path, type_name=None, group_by=(), sum_field=None):
+    groups = defaultdict(lambda: [0, 0])
+    for _, event_type, fields in read_events(path):
+        if type_name is None:
+            key = (event_type.name,)
+        elif event_type.name != type_name:
+            continue
+        else:
+            key = tuple(fields[name] for name in group_by)
+        groups[key][0] += 1
+        if sum_field is not None:
+            groups[key][1] += fields[sum_field]
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate events from a PyRPG telemetry file.")
+    parser.add_argument('path', help="Telemetry file written by the game")
+    parser.add_argument('--type', dest='type_name', help="Only count events of this type, e.g. Damage")
+    parser.add_argument('--group-by', nargs='*', default=[], help="Fields to group by (requires --type)")
+    parser.add_argument('--sum', dest='sum_field', help="Integer field to total per group (requires --type)")
+    args = parser.parse_args()
+
+    if args.type_name is None and (args.group_by or args.sum_field):
+        parser.error("--group-by and --sum require --type")
+    if args.type_name is not None:
+        event_type = next((t for t in EVENT_TYPES.values() if t.name == args.type_name), None)
+        if event_type is None:
+            parser.error(f"unknown event type {args.type_name}")
+        for field in args.group_by + ([args.sum_field] if args.sum_field else []):
+            if field not in event_type.field_names():
+                parser.error(f"{args.type_name} has no field {field}")
+        if args.sum_field and dict(event_type.fields)[args.sum_field] is not int:
+            parser.error(f"{args.type_name}.{args.sum_field} is not an integer field")
+
+    groups = query(args.path, args.type_name, args.group_by, args.sum_field)
+    for key, (count, total) in sorted(groups.items(), key=lambda item: -item[1][0]):
+        label = ', '.join(str(part) for part in key) or args.type_name
+        line = f"{label:40} {count:>8}"
+        if args.sum_field:
+            line += f"  {args.sum_field}={total}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import random
+import unittest
+
+# Run headless: these must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import events
+import PyRPG
+
+# Mostly walking and confirming, with the odd menu key mixed in
+KEYS = [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d] * 3 + [pygame.K_RETURN] * 4 + [
+    pygame.K_UP, pygame.K_DOWN, pygame.K_e, pygame.K_i, pygame.K_ESCAPE, pygame.K_r]
+
+
+class GameTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.game = PyRPG.Game()
+        self.published = []
+        self.game.events.subscribe_all(lambda event_type, event: self.published.append((event_type, event)))
+
+    def test_death_publishes_no_further_encounter(self):
+        game = self.game
+        game.game_started = True
+        enemy = game.enemies[0]
+        game.player.pos = [enemy.pos[0] - 1, enemy.pos[1]]
+        game.update()
+        self.assertTrue(game.in_battle)
+
+        game.player.health = 1
+        game.enemy_attack()
+        self.assertTrue(game.player_dead)
+        for _ in range(5):
+            game.update()
+
+        types = [event_type for event_type, _ in self.published]
+        self.assertEqual(types[-1], events.PlayerDied)
+        self.assertEqual(types.count(events.Encounter), 1)
+        self.assertFalse(game.in_battle)
+
+
+class RenderIndependenceTest(unittest.TestCase):
+    def play(self, renders_per_step):
+        random.seed(1)
+        keys = random.Random(2)
+        game = PyRPG.Game()
+        enemy = game.enemies[0]
+        game.player.pos = [enemy.pos[0] - 2, enemy.pos[1]]  # Close enough for battles to happen early
+        published = []
+        game.events.subscribe_all(lambda event_type, event: published.append((event_type, event)))
+        for step in range(1500):
+            if step % 3 == 0:
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=keys.choice(KEYS)))
+            game.handle_events()
+            game.update()
+            for i in range(renders_per_step):
+                game.render((i + 1) / renders_per_step)
+        state = {
+            'player': (game.player.pos, game.player.health, [item and item.name for item in game.player.inventory.items]),
+            'enemies': [(enemy.name, enemy.pos, enemy.health) for enemy in game.enemies],
+            'map': game.current_map_index,
+            'flags': (game.game_started, game.in_battle, game.player_dead, game.show_inventory, game.show_action_menu),
+            'battle_log': list(game.battle_log),
+            'messages': list(game.messages),
+            'timers': (game.sim_time, game.entity_display_index),
+        }
+        return state, published
+
+    def test_skipping_or_repeating_renders_does_not_change_outcomes(self):
+        state, published = self.play(renders_per_step=0)
+        self.assertTrue(any(event_type is events.Damage for event_type, _ in published))
+        for renders_per_step in (1, 3):
+            self.assertEqual(self.play(renders_per_step), (state, published))
+
+
+if __name__ == '__main__':
+    unittest.main()
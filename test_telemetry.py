@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import events
+import telemetry
+from telemetry import TelemetrySink, read_events, query
+
+
+class TelemetryRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def record_session(self, published):
+        bus = events.EventBus()
+        sink = TelemetrySink(self.path, flush_interval=60)
+        sink.attach(bus)
+        for event_type, event in published:
+            bus.publish(event_type, *event)
+        sink.close()
+
+    def test_events_round_trip_across_sessions(self):
+        first = [
+            (events.Encounter, ('Goblin', 3, 4, 0)),
+            (events.Damage, ('Player', 'Goblin', 12, False)),
+            (events.Damage, ('Goblin', 'Player', 3, True)),
+            (events.ItemPickedUp, ('Health Potion', 1)),
+        ]
+        # Strings are interned again from id 0 in the second session, in a different order
+        second = [
+            (events.Damage, ('Orc', 'Player', 7, False)),
+            (events.Damage, ('Player', 'Orc', 9, False)),
+            (events.MapTransition, (0, 1)),
+        ]
+        self.record_session(first)
+        self.record_session(second)
+
+        read = [(event_type, fields) for _, event_type, fields in read_events(self.path)]
+        expected = [(event_type, event_type.as_dict(event)) for event_type, event in first + second]
+        self.assertEqual(read, expected)
+
+        damage = query(self.path, 'Damage', ['attacker'], 'amount')
+        self.assertEqual(damage[('Player',)], [2, 21])
+        self.assertEqual(damage[('Goblin',)], [1, 3])
+        self.assertEqual(damage[('Orc',)], [1, 7])
+
+    def test_torn_batch_is_skipped(self):
+        self.record_session([(events.Damage, ('Player', 'Goblin', 12, False))] * 3)
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        second = [
+            (events.Encounter, ('Orc', 14, 4, 2)),
+            (events.Damage, ('Orc', 'Player', 7, False)),
+        ]
+        self.record_session(second)
+
+        read = [(event_type, fields) for _, event_type, fields in read_events(self.path)]
+        self.assertEqual(read, [(event_type, event_type.as_dict(event)) for event_type, event in second])
+
+    def test_unknown_event_codes_are_skipped(self):
+        future = events.EventType(200, 'FutureEvent', value=int)
+        try:
+            self.record_session([
+                (future, (1,)),
+                (events.Defend, ('Goblin',)),
+            ])
+        finally:
+            del events.EVENT_TYPES[200]
+
+        read = [(event_type, fields) for _, event_type, fields in read_events(self.path)]
+        self.assertEqual(read, [(events.Defend, {'enemy': 'Goblin'})])
+
+    def test_sum_rejects_non_integer_fields(self):
+        self.record_session([(events.Damage, ('Player', 'Goblin', 12, False))])
+        argv = ['telemetry.py', self.path, '--type', 'Damage', '--sum', 'attacker']
+        with mock.patch.object(sys, 'argv', argv), mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                telemetry.main()
+
+    def test_write_failure_disables_recording(self):
+        sink = TelemetrySink(os.path.join(self.path, 'missing', 'events.bin'), flush_interval=60)
+        sink.record(events.Defend, ('Goblin',))
+        sink.close()
+        self.assertTrue(sink.failed)
+        sink.record(events.Defend, ('Goblin',))
+        self.assertEqual(len(sink.pending), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()